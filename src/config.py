@@ -19,10 +19,21 @@ FALLBACK_LLM_MODELS = [
 ]
 RATE_LIMIT_DELAY = float(os.getenv("RATE_LIMIT_DELAY", "2"))
 # Rate Limiting and Concurrency
+# Requests per minute allowed on each API key. Unset, one request per
+# RATE_LIMIT_DELAY seconds per key, like the old per-entry stagger; 0 disables
+_raw_api_key_rpm = os.getenv("API_KEY_RPM", "").strip()
+API_KEY_RPM = (
+    float(_raw_api_key_rpm)
+    if _raw_api_key_rpm
+    else (60 / RATE_LIMIT_DELAY if RATE_LIMIT_DELAY > 0 else 0)
+)
 RATE_LIMIT_IF_QUOTA_EXCEEDED = float(os.getenv("RATE_LIMIT_IF_QUOTA_EXCEEDED", "30"))
 MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "5"))
+MAX_CONCURRENT_FILES = int(os.getenv("MAX_CONCURRENT_FILES", "4"))
 MAX_CONCURRENT_FILE_OPENS = int(os.getenv("MAX_CONCURRENT_FILE_OPENS", "999"))
 MAX_GLOBAL_RETRIES = int(os.getenv("MAX_GLOBAL_RETRIES", "3"))
+# Upper bound for the exponential backoff between retries, in seconds
+MAX_RETRY_DELAY = float(os.getenv("MAX_RETRY_DELAY", "300"))
 
 # Directory Configuration
 BASE_DIR = os.getenv(
@@ -33,6 +44,17 @@ OUTPUT_DIR = os.getenv("OUTPUT_DIR", os.path.join(BASE_DIR, "translated_output")
 IMPROVE_DIR = os.getenv("IMPROVE_DIR", os.path.join(BASE_DIR, "improved_output"))
 GLOSSARY_DIR = os.getenv("GLOSSARY_DIR", os.path.join(BASE_DIR, "Resource/glossary"))
 
+# Cache Configuration (set TRANSLATION_CACHE_DB to an empty value to disable)
+TRANSLATION_CACHE_DB = os.getenv(
+    "TRANSLATION_CACHE_DB", os.path.join(BASE_DIR, ".translation_cache.sqlite3")
+)
+# Also cache/reuse answers from FALLBACK_LLM_MODELS (off: only the primary model's)
+CACHE_FALLBACK_RESPONSES = os.getenv("CACHE_FALLBACK_RESPONSES", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
 # Mode Configuration
 VALID_MODES = ["translate", "improve"]
 DEFAULT_MODE = os.getenv("DEFAULT_MODE", "translate")
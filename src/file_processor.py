@@ -1,24 +1,26 @@
 from concurrent.futures import thread
-import json
 import time
 from pathlib import Path
-import aiofiles
 import asyncio
 from tqdm.asyncio import tqdm as async_tqdm
 from src.translator import translate_text
-from src.prompt_preparer import prepare_prompt_data
-from src.config import MAX_CONCURRENT, OUTPUT_DIR, RATE_LIMIT_DELAY
-from src.utils import SPECIAL_CHARS, postprocess_text
+from src.prompt_preparer import PromptRow, prepare_prompt_data
+from src.config import MAX_CONCURRENT, OUTPUT_DIR
+from src.utils import is_untranslatable, postprocess_text, write_json_file
 from src.logger import logger
 
+# Shared by every file being processed so concurrent files don't multiply
+# the number of in-flight API calls beyond MAX_CONCURRENT
+entry_semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+
 
 async def process_entry(
     entry,
-    thread_idx,
     translate_pairs,
     mode="translate",
     prompt_data=None,
     glossary_text=None,
+    glossary_automaton=None,
     translation_cache=None,
     run_stats=None,
 ):
@@ -26,10 +28,10 @@ async def process_entry(
 
     Args:
         entry: The entry to process (dict with 'Name' and 'Text' keys)
-        thread_idx: Thread index for concurrent processing
         mode: 'translate' for fresh translation or 'improve' for improving existing translations
         prompt_data: Pre-prepared prompt data containing context and templates, including raw_translation for improve mode
         glossary_text (dict, optional): Glossary map from original text to translated text.
+        glossary_automaton (optional): Automaton over the glossary terms for substring matching.
         translation_cache (dict, optional): Cache of previously translated text.
         run_stats (dict, optional): Dictionary to store run statistics.
 
@@ -51,9 +53,9 @@ async def process_entry(
             run_stats["empty"] += 1
         return entry
 
-    # Skip special characters
-    if original_text in SPECIAL_CHARS:
-        logger.debug(f"Skipping special character: {original_text}")
+    # Skip special characters and text without any Chinese to translate
+    if is_untranslatable(original_text):
+        logger.debug(f"Skipping untranslatable text: {original_text}")
         if run_stats:
             run_stats["special_chars"] += 1
         return {"Name": name, "Text": original_text}
@@ -94,21 +96,19 @@ async def process_entry(
             return {"Name": name, "Text": cached_translation}
 
     # Start translation
-    line_start = time.time()
-
-    if thread_idx != 1:
-        await asyncio.sleep((thread_idx % MAX_CONCURRENT) - 1 + RATE_LIMIT_DELAY)
+    line_start = time.perf_counter()
 
     translated_text = await translate_text(
         text=original_text,
         name=name,
         prompt_data=prompt_data,
-        original_to_translated=glossary_text,
+        glossary_automaton=glossary_automaton,
+        run_stats=run_stats,
     )
 
     # Log the translation with raw translation if available in improve mode
-    raw_translation = prompt_data.get("raw_translation") if prompt_data else None
-    line_end = time.time()
+    raw_translation = prompt_data.raw_translation if prompt_data else None
+    line_end = time.perf_counter()
 
     escaped_original = postprocess_text(original_text, for_json=False)
     escaped_final = postprocess_text(translated_text, for_json=False)
@@ -129,14 +129,14 @@ async def process_entry(
 
 async def process_json_file(
     file_path,
-    file_content,
-    translated_file_content,
-    all_data_dict,
+    original_data,
+    translated_data,
     translation_pairs,
     mode="translate",
     translated_dir=None,
     json_output_dir=None,
     glossary_text=None,
+    glossary_automaton=None,
     translation_cache=None,
     run_stats=None,
 ):
@@ -144,17 +144,20 @@ async def process_json_file(
 
     Args:
         file_path: Path to the input JSON file
-        file_content: Content of the input JSON file
-        translated_file_content: Content of the raw translated JSON file (for improve mode)
-        all_data_dict: Dictionary to store detailed translation data including original and raw translations
-        translation_pairs: List to store original=translation pairs for txt output
+        original_data: Parsed content of the input JSON file
+        translated_data: Parsed content of the raw translated JSON file (for improve mode)
+        translation_pairs: Dict of original=translation pairs for txt output, shared across files as a reuse cache
         mode: 'translate' for fresh translation or 'improve' for improving existing translations
         translated_dir: Directory containing existing translations (required for improve mode)
         json_output_dir: Directory for individual translated JSON files (defaults to OUTPUT_DIR/json)
         glossary_text (dict, optional): Glossary map from original text to translated text.
+        glossary_automaton (optional): Automaton over the glossary terms for substring matching.
         translation_cache (dict, optional): Cached translations from previous runs.
         run_stats (dict, optional): Dictionary to store run statistics.
 
+    Returns:
+        list: Detailed translation data for this file (Name, Original, Raw, Translated)
+
     Raises:
         ValueError: If mode is invalid or if translated_dir is missing in improve mode
     """
@@ -168,25 +171,22 @@ async def process_json_file(
     output_path = json_output_dir / file_name
 
     try:
-        file_start = time.time()
+        file_start = time.perf_counter()
 
-        data = json.loads(file_content)  # Parse JSON once
+        data = original_data  # Parsed once by the file producer
 
         # Prepare prompts with appropriate templates and context
         prompt_data_list, _ = await prepare_prompt_data(
             original_file_path=file_path,
             original_data=data,
-            translated_file_content=translated_file_content
-            if mode == "improve"
-            else None,
-            original_to_translated=glossary_text,
+            translated_data=translated_data if mode == "improve" else None,
+            glossary_automaton=glossary_automaton,
         )
         entries_list, is_array_format = _parse_json_entries(data)
         # Process all entries concurrently
         logger.concurrent_info(len(entries_list), MAX_CONCURRENT)
 
         tasks = _create_translation_tasks(entries_list, prompt_data_list)
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT)
         pbar = async_tqdm(
             total=len(tasks),
             desc=f"Entries in {file_name}",
@@ -195,14 +195,14 @@ async def process_json_file(
         )
 
         async def safe_process_entry_with_delay(args):
-            entry, prompt, idx = args
-            async with semaphore:
+            entry, prompt = args
+            async with entry_semaphore:
                 result = await process_entry(
                     entry=entry,
                     mode=mode,
-                    thread_idx=idx,
                     prompt_data=prompt,
                     glossary_text=glossary_text,
+                    glossary_automaton=glossary_automaton,
                     translate_pairs=translation_pairs,
                     translation_cache=translation_cache,
                     run_stats=run_stats,
@@ -220,24 +220,24 @@ async def process_json_file(
             data["entries"]["Array"] = translations
         else:
             data["entries"] = translations
-        async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(data, ensure_ascii=False, indent=2))
+        await asyncio.to_thread(write_json_file, output_path, data)
 
-        await _process_and_store_results(
+        file_details = await _process_and_store_results(
             file_name=file_name,
             translations=translations,
             original_entries=entries_list,
-            all_data_dict=all_data_dict,
             mode=mode,
-            translated_file_content=translated_file_content,
+            translated_data=translated_data,
         )
 
-        file_end = time.time()
+        file_end = time.perf_counter()
         logger.info(
             f"Completed {file_name} - {len(translations)} translations in {file_end - file_start:.2f}s"
         )
+        return file_details
     except Exception as e:
         logger.error(f"Error processing {file_name}: {str(e)}")
+        return []
 
 
 def _parse_json_entries(data):
@@ -264,17 +264,12 @@ def _create_translation_tasks(entries_list, prompt_data_list):
         prompt = (
             prompt_data_list[idx]
             if idx < len(prompt_data_list)
-            else {
-                "idx": idx,
-                "name": entry.get("key", "") or entry.get("Name", ""),
-                "original_text": entry.get("value", "")
-                or entry.get("Text", "").strip(),
-                "glossary_matches": [],
-                "raw_translation": None,
-                "prompt": None,  # Will use default prompt in translator
-            }
+            else PromptRow(  # No prompt: translator uses its default prompt
+                name=entry.get("key", "") or entry.get("Name", ""),
+                original_text=entry.get("value", "") or entry.get("Text", "").strip(),
+            )
         )
-        tasks.append((entry, prompt, idx))
+        tasks.append((entry, prompt))
     return tasks
 
 
@@ -282,17 +277,16 @@ async def _process_and_store_results(
     file_name,
     translations,
     original_entries,
-    all_data_dict,
     mode,
-    translated_file_content,
+    translated_data,
 ):
-    raw_translation_data = None
-    if translated_file_content:
-        try:
-            raw_translation_data = json.loads(translated_file_content)
-        except json.JSONDecodeError:
-            logger.error(f"Could not parse raw translated file content for {file_name}")
+    # Index the raw translations by name once; the first entry with a name wins
+    raw_by_name = {}
+    if mode == "improve" and translated_data:
+        for trans_entry in translated_data.get("entries", {}).get("Array", []):
+            raw_by_name.setdefault(trans_entry.get("Name"), trans_entry)
 
+    file_details = []
     for entry, original_entry in zip(translations, original_entries):
         name = entry.get("Name")
         original_text = original_entry.get("Text", "").strip()
@@ -306,12 +300,10 @@ async def _process_and_store_results(
                 "Translated": final_text,
             }
 
-            if mode == "improve" and raw_translation_data:
-                for trans_entry in raw_translation_data.get("entries", {}).get(
-                    "Array", []
-                ):
-                    if trans_entry.get("Name") == name:
-                        entry_details["Raw"] = trans_entry.get("Text", "").strip()
-                        break
+            trans_entry = raw_by_name.get(name)
+            if trans_entry is not None:
+                entry_details["Raw"] = trans_entry.get("Text", "").strip()
+
+            file_details.append(entry_details)
 
-            all_data_dict.append(entry_details)
+    return file_details
@@ -1,12 +1,27 @@
-import json
-import aiofiles
+import asyncio
+import hashlib
+import pickle
+import sys
+import ahocorasick
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 from src.config import GLOSSARY_DIR
 from src.logger import logger
+from src.utils import get_entries, get_entry_fields, list_json_files
+
+# Bump when the pickled glossary/automaton layout changes so old caches are ignored
+GLOSSARY_CACHE_VERSION = 3
 
 
 async def load_glossary_async(glossary_file_path=None):
-    """Asynchronously load glossary data from JSON or TXT files."""
+    """Asynchronously load glossary data from JSON or TXT files.
+
+    Returns:
+        Tuple of (name_to_translated, original_to_translated, glossary_automaton)
+    """
     name_to_translated = {}
     original_to_translated = {}
     files_to_process = []
@@ -19,94 +34,41 @@ async def load_glossary_async(glossary_file_path=None):
     else:
         glossary_path = Path(GLOSSARY_DIR)
         if glossary_path.exists():
-            files_to_process.extend(list(glossary_path.glob("*.json")))
+            files_to_process.extend(sorted(list_json_files(glossary_path)))
         else:
             logger.warning(f"Glossary directory not found: {GLOSSARY_DIR}")
 
     if not files_to_process:
         logger.warning(f"No glossary files found in {GLOSSARY_DIR}")
-        return name_to_translated, original_to_translated
-
-    for file in files_to_process:
-        try:
-            async with aiofiles.open(file, "r", encoding="utf-8") as f:
-                content = await f.read()
-                if file.suffix == ".json":
-                    data = json.loads(content)
-                    if isinstance(data, list):
-                        for entry in data:
-                            name = entry.get("Name", "").strip()
-                            original = entry.get("Original", "").strip()
-                            translated = entry.get("Translated", "").strip()
-                            if name and translated:
-                                name_to_translated[name] = translated
-                            if original and translated:
-                                original_to_translated[original] = translated
-                    elif isinstance(data, dict):
-                        for k, v in data.items():
-                            if k.strip() and str(v).strip():
-                                name_to_translated[k.strip()] = str(v).strip()
-                elif file.suffix == ".txt":
-                    for line in content.splitlines():
-                        if "=" in line:
-                            original, translated = line.split("=", 1)
-                            original, translated = original.strip(), translated.strip()
-                            if original and translated:
-                                original_to_translated[original] = translated
-                                name_to_translated[original] = translated
-        except Exception as e:
-            logger.error(f"Failed to process glossary file {file}: {str(e)}")
-    return name_to_translated, original_to_translated
+        return name_to_translated, original_to_translated, None
+
+    cache_path = _glossary_cache_path(
+        glossary_file_path or GLOSSARY_DIR, files_to_process
+    )
+    cached = await asyncio.to_thread(_read_glossary_cache, cache_path)
+    if cached:
+        return cached
+
+    parsed_files = await asyncio.gather(
+        *[asyncio.to_thread(_parse_glossary_file, file) for file in files_to_process]
+    )
+    name_to_translated, original_to_translated = _merge_glossary_maps(parsed_files)
+    result = (
+        name_to_translated,
+        original_to_translated,
+        build_glossary_automaton(original_to_translated),
+    )
+    await asyncio.to_thread(_write_glossary_cache, cache_path, result)
+    return result
 
 
 async def load_old_translations_async(input_dir, translated_dir):
-    """Asynchronously load old translations by comparing input and translated directories."""
-    old_translations_map = {}
-    input_path = Path(input_dir)
-    translated_path = Path(translated_dir)
+    """Asynchronously load old translations by comparing input and translated directories.
 
-    if not translated_path.exists():
-        logger.warning(f"Translated directory not found: {translated_dir}")
-        return old_translations_map
-
-    def _parse_entries(data):
-        entries = data.get("entries", [])
-        return (
-            entries["Array"]
-            if isinstance(entries, dict) and "Array" in entries
-            else (entries if isinstance(entries, list) else [])
-        )
-
-    for t_file in translated_path.glob("*.json"):
-        o_file = input_path / t_file.name
-        if not o_file.exists():
-            continue
-        try:
-            async with aiofiles.open(o_file, "r", encoding="utf-8") as f:
-                o_data = json.loads(await f.read())
-            async with aiofiles.open(t_file, "r", encoding="utf-8") as f:
-                t_data = json.loads(await f.read())
-
-            o_entries, t_entries = _parse_entries(o_data), _parse_entries(t_data)
-            t_map = {
-                (e.get("key") or e.get("Name")): (e.get("value") or e.get("Text", ""))
-                for e in t_entries
-            }
-
-            for o_entry in o_entries:
-                name = o_entry.get("key") or o_entry.get("Name")
-                original_text = (
-                    o_entry.get("value") or o_entry.get("Text", "")
-                ).strip()
-                if name in t_map:
-                    translated_text = t_map[name].strip()
-                    if original_text and translated_text:
-                        old_translations_map[original_text] = translated_text
-        except Exception as e:
-            logger.error(
-                f"Failed to process old translation file pair ({o_file.name}, {t_file.name}): {e}"
-            )
-    return old_translations_map
+    Each file is small, so the whole scan runs on one worker thread with plain
+    reads instead of an aiofiles round-trip per open/read/close.
+    """
+    return await asyncio.to_thread(load_old_translations, input_dir, translated_dir)
 
 
 def load_glossary(glossary_file_path=None):
@@ -116,11 +78,10 @@ def load_glossary(glossary_file_path=None):
         glossary_file_path (str, optional): Absolute path to a specific glossary file (.json or .txt).
 
     Returns:
-        Tuple of (name_to_translated, original_to_translated) dictionaries
+        Tuple of (name_to_translated, original_to_translated, glossary_automaton)
 
     Raises:
         FileNotFoundError: If a specified glossary file is not found.
-        json.JSONDecodeError: If a glossary JSON file is invalid.
     """
     name_to_translated = {}
     original_to_translated = {}
@@ -136,53 +97,30 @@ def load_glossary(glossary_file_path=None):
         glossary_path = Path(GLOSSARY_DIR)
         if not glossary_path.exists():
             logger.warning(f"Glossary directory not found: {GLOSSARY_DIR}")
-            return name_to_translated, original_to_translated
-        files_to_process.extend(list(glossary_path.glob("*.json")))
+            return name_to_translated, original_to_translated, None
+        files_to_process.extend(sorted(list_json_files(glossary_path)))
         if not files_to_process:
             logger.warning(f"No glossary files found in {GLOSSARY_DIR}")
-            return name_to_translated, original_to_translated
-
-    for file in files_to_process:
-        try:
-            if file.suffix == ".json":
-                with open(file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                if isinstance(data, list):
-                    for entry in data:
-                        name = entry.get("Name", "").strip()
-                        original = entry.get("Original", "").strip()
-                        translated = entry.get("Translated", "").strip()
-
-                        if name and translated:
-                            name_to_translated[name] = translated
-                        if original and translated:
-                            original_to_translated[original] = translated
-
-                elif isinstance(data, dict):
-                    # fallback for dict format
-                    for k, v in data.items():
-                        if k.strip() and str(v).strip():
-                            name_to_translated[k.strip()] = str(v).strip()
-
-            elif file.suffix == ".txt":
-                with open(file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if "=" in line:
-                            original, translated = line.split("=", 1)
-                            original = original.strip()
-                            translated = translated.strip()
-                            if original and translated:
-                                original_to_translated[original] = translated
-                                # For TXT, we don't have a 'Name' field, so we'll use original for name_to_translated if needed
-                                name_to_translated[original] = translated
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in glossary file {file}: {str(e)}")
-        except Exception as e:
-            logger.error(f"Failed to process glossary file {file}: {str(e)}")
-    return name_to_translated, original_to_translated
+            return name_to_translated, original_to_translated, None
+
+    cache_path = _glossary_cache_path(
+        glossary_file_path or GLOSSARY_DIR, files_to_process
+    )
+    cached = _read_glossary_cache(cache_path)
+    if cached:
+        return cached
+
+    with ThreadPoolExecutor(max_workers=min(32, len(files_to_process))) as executor:
+        name_to_translated, original_to_translated = _merge_glossary_maps(
+            executor.map(_parse_glossary_file, files_to_process)
+        )
+    result = (
+        name_to_translated,
+        original_to_translated,
+        build_glossary_automaton(original_to_translated),
+    )
+    _write_glossary_cache(cache_path, result)
+    return result
 
 
 def load_old_translations(input_dir, translated_dir):
@@ -195,41 +133,28 @@ def load_old_translations(input_dir, translated_dir):
         logger.warning(f"Translated directory not found: {translated_dir}")
         return old_translations_map
 
-    def _parse_entries(data):
-        entries = data.get("entries", [])
-        if isinstance(entries, dict) and "Array" in entries:
-            return entries["Array"]
-        return entries if isinstance(entries, list) else []
-
-    for t_file in translated_path.glob("*.json"):
+    for t_file in list_json_files(translated_path):
         o_file = input_path / t_file.name
         if not o_file.exists():
             continue
 
         try:
-            with open(o_file, "r", encoding="utf-8") as f:
-                o_data = json.load(f)
-            with open(t_file, "r", encoding="utf-8") as f:
-                t_data = json.load(f)
+            o_data = orjson.loads(o_file.read_bytes())
+            t_data = orjson.loads(t_file.read_bytes())
 
-            o_entries = _parse_entries(o_data)
-            t_entries = _parse_entries(t_data)
+            o_entries = get_entries(o_data)
+            t_entries = get_entries(t_data)
 
-            t_map = {
-                (e.get("key") or e.get("Name")): (e.get("value") or e.get("Text", ""))
-                for e in t_entries
-            }
+            t_map = dict(map(get_entry_fields, t_entries))
 
             for o_entry in o_entries:
-                name = o_entry.get("key") or o_entry.get("Name")
-                original_text = (
-                    o_entry.get("value") or o_entry.get("Text", "")
-                ).strip()
+                name, original_text = get_entry_fields(o_entry)
+                original_text = original_text.strip()
                 if name in t_map:
                     translated_text = t_map[name].strip()
                     if original_text and translated_text:
                         old_translations_map[original_text] = translated_text
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(
                 f"Invalid JSON in old translation file pair ({o_file.name}, {t_file.name}): {e}"
             )
@@ -241,28 +166,194 @@ def load_old_translations(input_dir, translated_dir):
     return old_translations_map
 
 
+def _parse_glossary_file(file):
+    """Parse a single glossary file, run on a worker thread by the loaders
+
+    Keys and translations are interned so the many repeated translations
+    (and terms shared between files) are stored once.
+
+    Returns:
+        Tuple of (name_to_translated, original_to_translated) for this file only
+    """
+    name_to_translated = {}
+    original_to_translated = {}
+    try:
+        if file.suffix == ".json":
+            data = orjson.loads(file.read_bytes())
+
+            if isinstance(data, list):
+                for entry in data:
+                    name = entry.get("Name", "").strip()
+                    original = entry.get("Original", "").strip()
+                    translated = entry.get("Translated", "").strip()
+
+                    if not translated:
+                        continue
+                    translated = sys.intern(translated)
+                    if name:
+                        name_to_translated.setdefault(sys.intern(name), translated)
+                    if original:
+                        original_to_translated.setdefault(
+                            sys.intern(original), translated
+                        )
+
+            elif isinstance(data, dict):
+                # fallback for dict format
+                for k, v in data.items():
+                    if k.strip() and str(v).strip():
+                        name_to_translated.setdefault(
+                            sys.intern(k.strip()), sys.intern(str(v).strip())
+                        )
+
+        elif file.suffix == ".txt":
+            lines = file.read_text(encoding="utf-8").splitlines()
+            pairs = [line.split("=", 1) for line in lines if "=" in line]
+            for original, translated in pairs:
+                original = original.strip()
+                translated = translated.strip()
+                if original and translated:
+                    original = sys.intern(original)
+                    translated = sys.intern(translated)
+                    original_to_translated.setdefault(original, translated)
+                    # For TXT, we don't have a 'Name' field, so we'll use original for name_to_translated if needed
+                    name_to_translated.setdefault(original, translated)
+
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Invalid JSON in glossary file {file}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Failed to process glossary file {file}: {str(e)}")
+    return name_to_translated, original_to_translated
+
+
+def _merge_glossary_maps(parsed_files):
+    """Merge per-file glossary maps, keeping the first translation seen for a term
+
+    Args:
+        parsed_files: Iterable of (name_to_translated, original_to_translated)
+            tuples as returned by _parse_glossary_file, in file order
+
+    Returns:
+        Tuple of merged (name_to_translated, original_to_translated)
+    """
+    name_to_translated = {}
+    original_to_translated = {}
+    duplicate_count = 0
+    for file_name_map, file_original_map in parsed_files:
+        for name, translated in file_name_map.items():
+            name_to_translated.setdefault(name, translated)
+        for original, translated in file_original_map.items():
+            if original in original_to_translated:
+                duplicate_count += 1
+            else:
+                original_to_translated[original] = translated
+    if duplicate_count:
+        logger.info(
+            f"Skipped {duplicate_count} duplicate glossary terms already defined in an earlier file"
+        )
+    return name_to_translated, original_to_translated
+
+
+def _glossary_cache_path(source, files_to_process):
+    """Get the cache file path for a glossary source (a file or directory)
+
+    The name is .cache.<source>.<content>.pkl: the first hash identifies the
+    source so caches of different sources sharing a directory don't replace
+    each other, the second covers the name, mtime and size of its files.
+    """
+    source_tag = hashlib.sha1(str(Path(source).resolve()).encode("utf-8")).hexdigest()
+    signature = [GLOSSARY_CACHE_VERSION]
+    for file in sorted(files_to_process):
+        stat = file.stat()
+        signature.append((file.name, stat.st_mtime_ns, stat.st_size))
+    digest = hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:16]
+    return files_to_process[0].parent / f".cache.{source_tag[:8]}.{digest}.pkl"
+
+
+def _read_glossary_cache(cache_path):
+    """Load a previously pickled (name_to_translated, original_to_translated, automaton)
+
+    Returns:
+        The cached tuple, or None if there is no usable cache
+    """
+    if not cache_path.exists():
+        return None
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        logger.debug(f"Loaded glossary from cache {cache_path}")
+        return cached
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable glossary cache {cache_path}: {str(e)}")
+        return None
+
+
+def _write_glossary_cache(cache_path, result):
+    """Pickle the loaded glossary next to its source files
+
+    Only older caches of the same source (same .cache.<source>. prefix) are
+    removed; caches of other glossary sources in the directory are kept.
+    """
+    source_prefix = cache_path.name.rsplit(".", 2)[0]
+    try:
+        for stale_cache in cache_path.parent.glob(f"{source_prefix}.*.pkl"):
+            if stale_cache != cache_path:
+                stale_cache.unlink(missing_ok=True)
+        with open(cache_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.warning(f"Could not write glossary cache {cache_path}: {str(e)}")
+
+
 def get_translated_by_name(name, name_to_translated):
     return name_to_translated.get(name)
 
 
-def find_original_matches(text, original_to_translated):
+def build_glossary_automaton(original_to_translated):
+    """Build an Aho-Corasick automaton over the original glossary terms
+
+    Args:
+        original_to_translated: Dictionary mapping original terms to translations
+
+    Returns:
+        ahocorasick.Automaton yielding (sort_key, original, translation) payloads,
+        or None if the glossary is empty
+    """
+    if not original_to_translated:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for index, (orig, trans) in enumerate(original_to_translated.items()):
+        if orig:
+            # Longest first, then glossary order for equal lengths; precomputed so
+            # matches sort on a plain tuple
+            automaton.add_word(orig, ((-len(orig), index), orig, trans))
+    automaton.make_automaton()
+    return automaton
+
+
+def find_original_matches(text, glossary_automaton):
     """Find all glossary terms that appear in the given text
 
     Args:
         text: The text to search in
-        original_to_translated: Dictionary mapping original terms to translations
+        glossary_automaton: Automaton built by build_glossary_automaton
 
     Returns:
-        List of (original, translation) tuples for matches found
+        List of (original, translation) tuples for matches found. The list is
+        shared between calls with the same text and must not be modified
     """
-    if not text or not original_to_translated:
+    if not text or not glossary_automaton:
         return []
-
-    matches = [
-        (orig, trans)
-        for orig, trans in original_to_translated.items()
-        if orig and orig in text
-    ]
-    return sorted(
-        matches, key=lambda x: len(x[0]), reverse=True
-    )  # Longest matches first
+    return _cached_original_matches(text, glossary_automaton)
+
+
+# Names and UI strings repeat across files, so most lookups hit. Keying on the
+# automaton itself (hashed by identity) keeps results from different glossaries
+# apart, and the cache reference keeps its id from being reused
+@lru_cache(maxsize=65536)
+def _cached_original_matches(text, glossary_automaton):
+    # A term can occur several times in the text; keep each one once
+    matches = dict.fromkeys(match for _, match in glossary_automaton.iter(text))
+    return [
+        (orig, trans) for _, orig, trans in sorted(matches, key=itemgetter(0))
+    ]  # Longest matches first, ties in glossary order
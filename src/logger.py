@@ -1,4 +1,5 @@
 import logging
+import sys
 from datetime import datetime
 from pathlib import Path
 from tqdm import tqdm
@@ -8,6 +9,14 @@ TRANSLATION = 25  # Between INFO and WARNING
 logging.addLevelName(TRANSLATION, "TRANSLATION")
 
 
+class _LazyFileHandler(logging.FileHandler):
+    """FileHandler that creates its log directory when the file is first opened"""
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
 class TranslationLogger:
     def __init__(self, log_dir="logs"):
         self.logger = logging.getLogger("translation")
@@ -16,16 +25,13 @@ class TranslationLogger:
         # Suppress warnings from google.generativeai library
         logging.getLogger("google.generativeai").setLevel(logging.ERROR)
 
-        # Create log directory if it doesn't exist
-        log_dir = Path(log_dir)
-        log_dir.mkdir(parents=True, exist_ok=True)
-
         # Create timestamp for log file
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_file = log_dir / f"translation_{timestamp}.log"
+        log_file = Path(log_dir) / f"translation_{timestamp}.log"
 
-        # File handler with detailed format
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        # File handler with detailed format; the directory and file are only
+        # created once the first record is written
+        file_handler = _LazyFileHandler(log_file, encoding="utf-8", delay=True)
         file_handler.setLevel(logging.DEBUG)
         file_format = logging.Formatter(
             "%(asctime)s [%(levelname)8s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
@@ -35,10 +41,23 @@ class TranslationLogger:
         # Add handlers to logger
         self.logger.addHandler(file_handler)
 
+        # tqdm.write takes tqdm's lock and redraws every bar; only worth it when
+        # the bars are actually drawn on a terminal
+        self._use_tqdm = sys.stderr.isatty()
+
+    def _echo(self, msg, *args):
+        """Mirror a message to the console without breaking the progress bars"""
+        if args:
+            msg = msg % args
+        if self._use_tqdm:
+            tqdm.write(msg)
+        else:
+            sys.stdout.write(f"{msg}\n")
+
     def translation(self, msg, *args, **kwargs):
         """Log translation-specific information"""
         self.logger.log(TRANSLATION, msg, *args, **kwargs)
-        tqdm.write(f"[TRANSLATION] {msg}", *args, **kwargs, nolock=False)
+        self._echo(f"[TRANSLATION] {msg}", *args)
 
     def debug(self, msg, *args, **kwargs):
         """Log detailed information for debugging"""
@@ -47,22 +66,22 @@ class TranslationLogger:
     def info(self, msg, *args, **kwargs):
         """Log general information about program execution"""
         self.logger.info(msg, *args, **kwargs)
-        tqdm.write(msg, *args, **kwargs, nolock=False)
+        self._echo(msg, *args)
 
     def warning(self, msg, *args, **kwargs):
         """Log warnings about potential issues"""
         self.logger.warning(msg, *args, **kwargs)
-        tqdm.write(f"[WARNING] {msg}", *args, **kwargs, nolock=False)
+        self._echo(f"[WARNING] {msg}", *args)
 
     def error(self, msg, *args, **kwargs):
         """Log errors that don't stop program execution"""
         self.logger.error(msg, *args, **kwargs)
-        tqdm.write(f"[ERROR] {msg}", *args, **kwargs, nolock=False)
+        self._echo(f"[ERROR] {msg}", *args)
 
     def critical(self, msg, *args, **kwargs):
         """Log critical errors that might stop program execution"""
         self.logger.critical(msg, *args, **kwargs)
-        tqdm.write(f"[CRITICAL] {msg}", *args, **kwargs)
+        self._echo(f"[CRITICAL] {msg}", *args)
 
     def translation_detail(
         self,
@@ -83,6 +102,9 @@ class TranslationLogger:
             raw_translation: Raw translation (for improve mode)
             mode: 'translate' or 'improve'
         """
+        if not self.logger.isEnabledFor(TRANSLATION):
+            return
+
         action = "Translation" if mode == "translate" else "Improvement"
         message = (
             f"{action} completed in {duration:.2f}s\n )"
@@ -128,31 +150,42 @@ class TranslationLogger:
             f"      - Reuse Translations: {from_reuse_translation}\n"
             f"    Total Time: {total_time:.2f}s"
         )
-        tqdm.write(summary)
+        self._echo(summary)
 
     def api_call(self, key_index, api_key, model_name):
         """Log API key and model usage"""
-        masked_key = f"{api_key[:10]}...{api_key[-4:]}"
-        self.debug(f"Using Model: {model_name}, API key {key_index}: {masked_key}")
+        self.logger.debug(
+            "Using Model: %s, API key %s: %.10s...%s",
+            model_name,
+            key_index,
+            api_key,
+            api_key[-4:],
+        )
 
     def translation_start(self, name, text, model_name):
         """Log the start of a translation"""
-        self.debug(
-            f"Starting translation for {name} with Model {model_name}: {text[:50]}..."
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self.logger.debug(
+            "Starting translation for %s with Model %s: %.50s...", name, model_name, text
         )
 
     def translation_output(self, text, duration, model_name):
         """Log translation output"""
-        self.debug(f"Translation with Model {model_name} completed in {duration:.2f}s")
-        self.debug(f"Output: {text}")
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self.logger.debug(
+            "Translation with Model %s completed in %.2fs", model_name, duration
+        )
+        self.logger.debug("Output: %s", text)
 
     def concurrent_info(self, count, workers):
         """Log concurrent processing information"""
-        tqdm.write(f"Processing {count} entries with {workers} concurrent workers")
+        self._echo(f"Processing {count} entries with {workers} concurrent workers")
 
     def google_api_warning(self, message):
         """Log Google API related warnings at debug level to reduce noise"""
-        self.debug(f"Google API: {message}")
+        self.logger.debug("Google API: %s", message)
 
 
 # Create a global logger instance
@@ -1,58 +1,153 @@
 from pathlib import Path
-import json
 import re
 import argparse
 import time
 import asyncio
-import aiofiles
-from collections import OrderedDict
+import orjson
 from tqdm.asyncio import tqdm as async_tqdm
 from src.file_processor import process_json_file
 import configparser
-from src.config import INPUT_DIR, OUTPUT_DIR, MAX_CONCURRENT_FILE_OPENS, VALID_MODES
+from src.config import (
+    INPUT_DIR,
+    OUTPUT_DIR,
+    MAX_CONCURRENT_FILE_OPENS,
+    MAX_CONCURRENT_FILES,
+    VALID_MODES,
+)
 from src.logger import logger
+from src.utils import list_json_files, write_json_file, write_pairs_file
 from src.glossary import load_glossary_async, load_old_translations_async
 
+# Only Simplified Chinese source files are translated; sniffed from the file header
+_LANG_CN_RE = re.compile(rb'"Language":\s*"ChineseSimplified"')
 
-async def file_producer(
-    file_paths, queue, semaphore, progress_bar, mode, translated_dir
+
+# Remembers the language sniff result per input file between runs
+LANGUAGE_MANIFEST_NAME = ".cn_files.json"
+
+
+def _load_language_manifest(manifest_path):
+    """Load the {file name: [mtime_ns, size, is_chinese]} manifest of a previous run"""
+    try:
+        return orjson.loads(manifest_path.read_bytes())
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable language manifest {manifest_path}: {e}")
+        return {}
+
+
+def _read_chinese_source(file_path, language_manifest, lang_filename_re=None):
+    """Read and parse a source file in one thread call if it is ChineseSimplified
+
+    Files whose path matches lang_filename_re are accepted without sniffing.
+    Files the manifest already records as not Chinese, with the same mtime and
+    size, are skipped without being opened. The sniff result of every file that
+    is read is stored back into the manifest.
+
+    Returns:
+        The parsed JSON data, or None if the language sniff failed
+
+    Raises:
+        orjson.JSONDecodeError: If the file is not valid JSON
+    """
+    if lang_filename_re and lang_filename_re.search(file_path.as_posix()):
+        return orjson.loads(file_path.read_bytes())
+
+    stat = file_path.stat()
+    signature = [stat.st_mtime_ns, stat.st_size]
+    if language_manifest.get(file_path.name) == [*signature, False]:
+        return None
+
+    # Read bytes: the sniff pattern is ASCII and orjson parses bytes directly.
+    # Source files are small, so one whole-file read beats a 4 KiB sniff + tail
+    content = file_path.read_bytes()
+    is_chinese = _LANG_CN_RE.search(content, 0, 4096) is not None
+    language_manifest[file_path.name] = [*signature, is_chinese]
+    if not is_chinese:
+        return None
+    return orjson.loads(content)
+
+
+def _read_translated_file(file_path):
+    """Read and parse an improve-mode raw translated file on a worker thread
+
+    Returns:
+        The parsed JSON data, or None if the file is not valid JSON
+    """
+    try:
+        return orjson.loads(file_path.read_bytes())
+    except orjson.JSONDecodeError:
+        logger.error(f"Could not parse raw translated file {file_path.name}")
+        return None
+
+
+def _read_file_pair(
+    original_file_path, translated_file_path, language_manifest, lang_filename_re
 ):
-    translated_files_map = {}
-    if mode == "improve" and translated_dir:
-        for t_file_path in translated_dir.glob("*.json"):
-            translated_files_map[t_file_path.name] = t_file_path
+    """Read a source file and its raw translated file (if any) in one thread call
+
+    Returns:
+        Tuple of (original_data, translated_data); original_data is None if the
+        source is not ChineseSimplified, and the raw file is then not read
+    """
+    original_data = _read_chinese_source(
+        original_file_path, language_manifest, lang_filename_re
+    )
+    if original_data is None or translated_file_path is None:
+        return original_data, None
+    return original_data, _read_translated_file(translated_file_path)
 
+
+async def file_producer(
+    file_paths,
+    queue,
+    semaphore,
+    progress_bar,
+    mode,
+    translated_files_map,
+    language_manifest,
+    lang_filename_re=None,
+    skip_filename_re=None,
+):
     async def read_file_and_put_in_queue(original_file_path):
-        async with semaphore:
-            progress_bar.set_description(
-                f"Queuing file: {original_file_path.name} (Queue size: {queue.qsize()})"
+        if skip_filename_re and skip_filename_re.search(original_file_path.as_posix()):
+            progress_bar.write(
+                f"Skipping file {original_file_path.name}: Matches --skip-filename-pattern."
             )
+            progress_bar.update(1)
+            return
 
-            original_content = None
-            translated_content = None
+        async with semaphore:
             translated_file_path = None
+            if mode == "improve":
+                translated_file_path = translated_files_map.get(original_file_path.name)
 
-            async with aiofiles.open(original_file_path, "r", encoding="utf-8") as f:
-                initial_chunk = await f.read(4096)
-                if not re.search(r'"Language":\s*"ChineseSimplified"', initial_chunk):
-                    progress_bar.write(
-                        f"Skipping file {original_file_path.name}: Not 'ChineseSimplified' or language field not found in initial chunk."
-                    )
-                    progress_bar.update(1)
-                    return
-                original_content = initial_chunk + await f.read()
-                async_tqdm.write(f"Queued file: {original_file_path.name}")
+            try:
+                original_data, translated_data = await asyncio.to_thread(
+                    _read_file_pair,
+                    original_file_path,
+                    translated_file_path,
+                    language_manifest,
+                    lang_filename_re,
+                )
+            except orjson.JSONDecodeError as e:
+                logger.error(f"Error processing {original_file_path.name}: {str(e)}")
+                progress_bar.update(1)
+                return
+            if original_data is None:
+                progress_bar.write(
+                    f"Skipping file {original_file_path.name}: Not 'ChineseSimplified' or language field not found in initial chunk."
+                )
+                progress_bar.update(1)
+                return
+            async_tqdm.write(f"Queued file: {original_file_path.name}")
 
             if mode == "improve":
-                translated_file_path = translated_files_map.get(original_file_path.name)
                 if translated_file_path:
-                    async with aiofiles.open(
-                        translated_file_path, "r", encoding="utf-8"
-                    ) as f:
-                        translated_content = await f.read()
-                        async_tqdm.write(
-                            f"Queued raw translated file: {translated_file_path.name}"
-                        )
+                    async_tqdm.write(
+                        f"Queued raw translated file: {translated_file_path.name}"
+                    )
 
                 else:
                     progress_bar.write(
@@ -62,9 +157,9 @@ async def file_producer(
             await queue.put(
                 (
                     original_file_path,
-                    original_content,
+                    original_data,
                     translated_file_path,
-                    translated_content,
+                    translated_data,
                 )
             )
 
@@ -80,30 +175,35 @@ async def file_consumer(
     translated_dir,
     json_output_dir,
     original_to_translated,
+    glossary_automaton,
     translation_cache,
     progress_bar,
     run_stats,
 ):
     while True:
-        original_file_path, original_content, _, translated_content = await queue.get()
-        try:
-            progress_bar.set_description(f"Processing file: {original_file_path.name}")
-            await process_json_file(
-                file_path=original_file_path,
-                file_content=original_content,
-                translated_file_content=translated_content,
-                all_data_dict=all_data_dict,
-                translation_pairs=translation_pairs,
-                mode=mode,
-                translated_dir=translated_dir,
-                json_output_dir=json_output_dir,
-                glossary_text=original_to_translated,
-                translation_cache=translation_cache,
-                run_stats=run_stats,
-            )
-            progress_bar.update(1)  # Update after file is fully processed
-        finally:
-            queue.task_done()
+        item = await queue.get()
+        if item is None:  # Sentinel from main_async: no more files
+            break
+        original_file_path, original_data, _, translated_data = item
+        # Shown on the next throttled redraw rather than forcing one per file
+        progress_bar.set_description(
+            f"Processing file: {original_file_path.name}", refresh=False
+        )
+        file_details = await process_json_file(
+            file_path=original_file_path,
+            original_data=original_data,
+            translated_data=translated_data,
+            translation_pairs=translation_pairs,
+            mode=mode,
+            translated_dir=translated_dir,
+            json_output_dir=json_output_dir,
+            glossary_text=original_to_translated,
+            glossary_automaton=glossary_automaton,
+            translation_cache=translation_cache,
+            run_stats=run_stats,
+        )
+        all_data_dict.extend(file_details)
+        progress_bar.update(1)  # Update after file is fully processed
 
 
 async def main_async():
@@ -155,6 +255,18 @@ async def main_async():
         "-olf",
         help="A single file with old translations for caching (optional)",
     )
+    parser.add_argument(
+        "--lang-filename-pattern",
+        "-lfp",
+        help="Regex on the input file path; matching files are treated as "
+        "ChineseSimplified without sniffing their content (optional)",
+    )
+    parser.add_argument(
+        "--skip-filename-pattern",
+        "-sfp",
+        help="Regex on the input file path; matching files are skipped without "
+        "being opened (optional)",
+    )
 
     # Temporarily parse to get config_file argument
     temp_args, _ = parser.parse_known_args()
@@ -196,9 +308,23 @@ async def main_async():
         parser.error("Provide either --old-dir or --old-file for caching, not both.")
 
     json_dir = Path(args.input_dir)
-    if not json_dir.is_dir() or not any(json_dir.glob("*.json")):
+    if not json_dir.is_dir():
         parser.error(f"Input directory not found or contains no JSON files: {json_dir}")
 
+    try:
+        lang_filename_re = (
+            re.compile(args.lang_filename_pattern)
+            if args.lang_filename_pattern
+            else None
+        )
+        skip_filename_re = (
+            re.compile(args.skip_filename_pattern)
+            if args.skip_filename_pattern
+            else None
+        )
+    except re.error as e:
+        parser.error(f"Invalid filename pattern: {e}")
+
     raw_dir = Path(args.raw_dir) if args.raw_dir else None
     if raw_dir and not raw_dir.is_dir():
         parser.error(f"Raw translations directory not found: {raw_dir}")
@@ -224,13 +350,18 @@ async def main_async():
     if args.old_file:
         logger.info(f"Using old translations cache file: {args.old_file}")
 
-    run_start = time.time()
+    run_start = time.perf_counter()
 
     # --- Asynchronous Data Loading ---
+    # Input discovery runs alongside the glossary/cache loads instead of before them
+    manifest_path = base_output_dir / LANGUAGE_MANIFEST_NAME
     tasks = {
+        "file_paths": asyncio.to_thread(list_json_files, json_dir),
+        "language_manifest": asyncio.to_thread(_load_language_manifest, manifest_path),
         "glossary": load_glossary_async(args.glossary_file),
-        "translation_cache": None,
     }
+    if args.mode == "improve":
+        tasks["translated_files"] = asyncio.to_thread(list_json_files, raw_dir)
     if args.old_dir:
         tasks["translation_cache"] = load_old_translations_async(
             args.input_dir, args.old_dir
@@ -239,16 +370,24 @@ async def main_async():
         # Assuming old-file has a glossary-like format
         tasks["translation_cache"] = load_glossary_async(args.old_file)
 
-    results = await asyncio.gather(*[task for task in tasks.values() if task])
+    results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
 
     # Process results
-    _, glossary_text = results[0]
+    file_paths = results["file_paths"]
+    if not file_paths:
+        parser.error(f"Input directory not found or contains no JSON files: {json_dir}")
+    language_manifest = results["language_manifest"]
+    translated_files_map = {
+        file_path.name: file_path for file_path in results.get("translated_files", [])
+    }
+    _, glossary_text, glossary_automaton = results["glossary"]
     translation_cache = {}
-    if len(results) > 1:
-        if args.old_file:
-            _, translation_cache = results[1]  # From load_glossary_async
-        else:
-            translation_cache = results[1]  # From load_old_translations_async
+    if args.old_file:
+        # From load_glossary_async
+        _, translation_cache, _ = results["translation_cache"]
+    elif args.old_dir:
+        # From load_old_translations_async
+        translation_cache = results["translation_cache"]
 
     if glossary_text:
         logger.info(f"Loaded {len(glossary_text)} glossary entries.")
@@ -257,7 +396,7 @@ async def main_async():
 
     # --- File Processing Pipeline ---
     all_data_dict = []
-    translation_pairs = OrderedDict()
+    translation_pairs = {}  # Insertion-ordered, written out in that order
     run_stats = {
         "from_cache": 0,
         "from_glossary": 0,
@@ -265,59 +404,73 @@ async def main_async():
         "empty": 0,
         "from_pairs": 0,
     }
-    file_paths = list(json_dir.glob("*.json"))
     total_files = len(file_paths)
     logger.info(f"Total files to process: {total_files}")
 
-    queue = asyncio.Queue()
+    # Bounded so the producer stops reading ahead once consumers fall behind
+    queue = asyncio.Queue(maxsize=2 * MAX_CONCURRENT_FILE_OPENS)
     semaphore = asyncio.Semaphore(MAX_CONCURRENT_FILE_OPENS)
 
     with async_tqdm(
-        total=total_files, desc="Initializing...", mininterval=0, miniters=1
+        total=total_files, desc="Initializing...", mininterval=0.25
     ) as progress_bar:
         producer_task = asyncio.create_task(
             file_producer(
-                file_paths, queue, semaphore, progress_bar, args.mode, raw_dir
-            )
-        )
-        consumer_task = asyncio.create_task(
-            file_consumer(
+                file_paths,
                 queue,
-                all_data_dict,
-                translation_pairs,
-                args.mode,
-                raw_dir,
-                json_output_dir,
-                glossary_text,
-                translation_cache,
+                semaphore,
                 progress_bar,
-                run_stats,
+                args.mode,
+                translated_files_map,
+                language_manifest,
+                lang_filename_re,
+                skip_filename_re,
             )
         )
+        # Several consumers so one slow file doesn't hold up the rest; the
+        # entry semaphore in file_processor still bounds the API concurrency
+        consumer_tasks = [
+            asyncio.create_task(
+                file_consumer(
+                    queue,
+                    all_data_dict,
+                    translation_pairs,
+                    args.mode,
+                    raw_dir,
+                    json_output_dir,
+                    glossary_text,
+                    glossary_automaton,
+                    translation_cache,
+                    progress_bar,
+                    run_stats,
+                )
+            )
+            for _ in range(MAX_CONCURRENT_FILES)
+        ]
 
         await producer_task
-        await queue.join()
-        consumer_task.cancel()
-        await asyncio.gather(consumer_task, return_exceptions=True)
+        # One sentinel per consumer; each exits after draining the files ahead of it
+        for _ in consumer_tasks:
+            await queue.put(None)
+        await asyncio.gather(*consumer_tasks)
 
     # --- Save Results ---
     details_file = details_output_dir / "translation_details.json"
-    async with aiofiles.open(details_file, "w", encoding="utf-8") as f:
-        await f.write(json.dumps(all_data_dict, ensure_ascii=False, indent=2))
-
     pairs_file = pairs_output_dir / "translation_pairs.txt"
-    async with aiofiles.open(pairs_file, "w", encoding="utf-8") as f:
-        await f.write(
-            "\n".join(
-                [
-                    f"{original}={translated}"
-                    for original, translated in translation_pairs.items()
-                ]
-            )
-        )
+    # Drop files that have left the input directory before saving the manifest
+    input_names = {file_path.name for file_path in file_paths}
+    language_manifest = {
+        name: entry for name, entry in language_manifest.items() if name in input_names
+    }
+    # Serialize and write on worker threads so the event loop isn't blocked
+    await asyncio.gather(
+        asyncio.to_thread(write_json_file, details_file, all_data_dict),
+        asyncio.to_thread(write_pairs_file, pairs_file, translation_pairs),
+        asyncio.to_thread(write_json_file, manifest_path, language_manifest),
+    )
 
     # --- Final Summary ---
-    run_end = time.time()
+    run_end = time.perf_counter()
     logger.run_summary(
         files_processed=len(file_paths),
         total_translations=len(all_data_dict),
@@ -335,7 +488,13 @@ async def main_async():
 
 
 def main():
-    asyncio.run(main_async())
+    # uvloop is optional (not available on Windows); use it when installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main_async())
+    else:
+        uvloop.run(main_async())
 
 
 if __name__ == "__main__":
@@ -1,106 +1,135 @@
-import json
-from src.utils import preprocess_text, STORY_CONTEXT_PROMPT, RULES_PROMPT, START_PROMPT
+import asyncio
+from dataclasses import dataclass, field
+from src.utils import (
+    get_entries,
+    get_entry_fields,
+    is_untranslatable,
+    preprocess_text,
+    PROMPT_HEADER,
+)
 from src.glossary import find_original_matches
 from src.logger import logger
 
+# Static prompt pieces, built once instead of per entry
+_IMPROVE_RULE = """
+8. Sử dụng bản dịch thô để THAM KHẢO về xưng hô cũng như mối quan hệ giữa các nhân vật.
+"""
+_GLOSSARY_HEADER = "\nMột số thuật ngữ/cụm từ cần giữ nguyên:"
+_FRESH_PREFIX = f"{PROMPT_HEADER}\n"
+_IMPROVE_PREFIX = f"{PROMPT_HEADER}\n{_IMPROVE_RULE}\n"
+
+
+@dataclass(slots=True)
+class PromptRow:
+    """Prepared translation prompt for one entry
+
+    prompt is None when there is nothing to send (empty or special-marker
+    text); translate_text then falls back to its default prompt.
+    """
+
+    name: str
+    original_text: str
+    glossary_matches: list = field(default_factory=list)
+    raw_translation: str | None = None
+    prompt: str | None = None
+
 
 async def prepare_prompt_data(
     original_file_path,
     original_data,
-    translated_file_content=None,
-    original_to_translated=None,
+    translated_data=None,
+    glossary_automaton=None,
 ):
     """
     Prepare translation prompts using:
     - name (key) and text from original file
     - glossary matches for the text
     - existing translations from translated files if available
+
+    Prompt building is pure CPU work, so it runs on a worker thread to keep the
+    event loop free for the other files' API calls.
     """
+    return await asyncio.to_thread(
+        _build_prompt_data,
+        original_file_path,
+        original_data,
+        translated_data,
+        glossary_automaton,
+    )
+
+
+def _build_prompt_data(
+    original_file_path, original_data, translated_data, glossary_automaton
+):
+    """Synchronous body of prepare_prompt_data"""
     # Load original file
     # original_data is already loaded in process_json_file
 
     # Extract entries from original
-    entries = original_data.get("entries", [])
-    if isinstance(entries, dict) and "Array" in entries:
-        original_entries = entries["Array"]
-    else:
-        original_entries = entries
-
-    logger.debug(f"Original entries for {original_file_path.name}: {original_entries}")
-
-    # If translated_file_content provided, parse it
-    translated_data = None
-    if translated_file_content:
-        try:
-            translated_data = json.loads(translated_file_content)
-        except json.JSONDecodeError:
-            logger.error(
-                f"Could not parse translated file content for {original_file_path.name}"
-            )
+    original_entries = get_entries(original_data)
+
+    # The file log records DEBUG, so log counts rather than formatting whole files
+    logger.debug(
+        "Original entries for %s: %d", original_file_path.name, len(original_entries)
+    )
 
+    # translated_data is the raw translated file, parsed by the file producer
     translated_file_entries = None
     if translated_data:
-        entries = translated_data.get("entries", [])
-        if isinstance(entries, dict) and "Array" in entries:
-            translated_file_entries = entries["Array"]
-        else:
-            translated_file_entries = entries
+        translated_file_entries = get_entries(translated_data)
+
+    # Index the raw translations by name; the first entry with a name wins
+    raw_translations_by_name = {}
+    for trans_entry in translated_file_entries or []:
+        trans_name, trans_text = get_entry_fields(trans_entry)
+        raw_translations_by_name.setdefault(trans_name, trans_text)
 
     prompt_data = []
+    # Bound to locals once: the loop runs for every entry of every file
+    add_row = prompt_data.append
+    get_raw_translation = raw_translations_by_name.get
     for entry in original_entries:
         # Get key name and original text
-        name = entry.get("key", "") or entry.get("Name", "")
-        text = entry.get("value", "") or entry.get("Text", "")
-        text = preprocess_text(text.strip())
+        name, text = get_entry_fields(entry)
+        text = preprocess_text(text)  # preprocess_text strips
+
+        # process_entry never translates empty, special-marker or non-Chinese
+        # text, so skip the glossary scan and prompt formatting for it
+        if not text or is_untranslatable(text):
+            add_row(PromptRow(name, text))
+            continue
 
         # Find glossary matches for the text
-        glossary_matches = find_original_matches(text, original_to_translated)
+        glossary_matches = find_original_matches(text, glossary_automaton)
 
         # Check if we have a raw translation by name
-        raw_translation = None
-        if translated_file_entries:
-            for trans_entry in translated_file_entries:
-                trans_name = trans_entry.get("key", "") or trans_entry.get("Name", "")
-                if trans_name == name:
-                    raw_translation = trans_entry.get("value", "") or trans_entry.get(
-                        "Text", ""
-                    )
-                    break
-        prompt = []
-        prompt.append(f"{START_PROMPT}\n{STORY_CONTEXT_PROMPT}\n{RULES_PROMPT}\n")
+        raw_translation = get_raw_translation(name)
+        # Glossary section, followed by the line break that separates it from the text
+        glossary_section = ""
+        if glossary_matches:
+            glossary_section = (
+                _GLOSSARY_HEADER
+                + "".join(f"\n\n- {orig}={trans}" for orig, trans in glossary_matches)
+                + "\n"
+            )
 
         # Select and build the appropriate prompt template
         if raw_translation:
             # Template for improving existing translation
-            prompt.append("""
-8. Sử dụng bản dịch thô để THAM KHẢO về xưng hô cũng như mối quan hệ giữa các nhân vật.
-""")
-            if glossary_matches:
-                prompt.append("\nMột số thuật ngữ/cụm từ cần giữ nguyên:")
-                for orig, trans in glossary_matches:
-                    prompt.append(f"\n- {orig}={trans}")
-            prompt.append(f"\nVăn bản cần được dịch: \n{text}")
-            prompt.append(f"\nBản dịch thô để tham khảo: \n{raw_translation}")
-
+            prompt = (
+                f"{_IMPROVE_PREFIX}{glossary_section}"
+                f"\nVăn bản cần được dịch: \n{text}"
+                f"\n\nBản dịch thô để tham khảo: \n{raw_translation}"
+            )
         else:
             # Template for fresh translation
-            if glossary_matches:
-                prompt.append("\nMột số thuật ngữ/cụm từ cần giữ nguyên:")
-                for orig, trans in glossary_matches:
-                    prompt.append(f"\n- {orig}={trans}")
-            prompt.append(f"\nVăn bản cần dịch: {text}")
+            prompt = f"{_FRESH_PREFIX}{glossary_section}\nVăn bản cần dịch: {text}"
 
         # Store the data
-        prompt_data.append(
-            {
-                "name": name,
-                "original_text": text,
-                "glossary_matches": glossary_matches,
-                "raw_translation": raw_translation,
-                "prompt": "\n".join(prompt),
-            }
-        )
-
-
-    logger.debug(f"Generated prompt data list: {prompt_data}")
+        add_row(PromptRow(name, text, glossary_matches, raw_translation, prompt))
+
+
+    logger.debug(
+        "Generated %d prompts for %s", len(prompt_data), original_file_path.name
+    )
     return prompt_data, translated_file_entries
@@ -1,55 +1,274 @@
+import hashlib
 import itertools
+import random
+import sqlite3
+import google.ai.generativelanguage as glm
 import google.generativeai as genai
 import asyncio
+from google.api_core import exceptions as google_exceptions
 import time
+from pathlib import Path
 from threading import Lock
 from src.config import (
     API_KEYS,
+    API_KEY_RPM,
+    CACHE_FALLBACK_RESPONSES,
     PRIMARY_LLM_MODEL,
     FALLBACK_LLM_MODELS,
     RATE_LIMIT_IF_QUOTA_EXCEEDED,
     RATE_LIMIT_DELAY,
     MAX_GLOBAL_RETRIES,
+    MAX_RETRY_DELAY,
+    TRANSLATION_CACHE_DB,
 )
+from src.glossary import get_translated_by_name, find_original_matches
 from src.logger import logger
-from src.utils import START_PROMPT, RULES_PROMPT, STORY_CONTEXT_PROMPT
+from src.utils import PROMPT_HEADER, is_untranslatable, postprocess_text
 
-# Thread safety for API key rotation
+# Guards the model cache and per-key quota state
 api_key_lock = Lock()
 
-# Initialize API key rotation
-api_key_cycle = itertools.cycle(API_KEYS)
+# API key rotation; next() on itertools.count is atomic, so picking a key
+# needs no lock and the counter itself is the index into API_KEYS
+_key_counter = itertools.count()
+
+# Prompt used when no prepared prompt is given; only the text is appended per call
+_DEFAULT_PROMPT_PREFIX = f"{PROMPT_HEADER}\n"
 
 generation_config = {
     "temperature": 0.1,
     "max_output_tokens": 1500,
 }
 
+# A translation is about as long as its source, so short lines get a smaller
+# output budget; replies cut off by it are retried with the full budget
+OUTPUT_TOKENS_PER_CHAR = 4
+OUTPUT_TOKENS_MARGIN = 32
+_MAX_TOKENS = glm.Candidate.FinishReason.MAX_TOKENS
+
+# Fraction of each retry delay that is randomized so concurrent workers spread out
+RETRY_JITTER = 0.5
+
+# Keys that hit their quota sit out for KEY_COOLDOWN seconds, doubling on each
+# consecutive quota error up to KEY_COOLDOWN_MAX, and are reset by a success
+KEY_COOLDOWN = 60
+KEY_COOLDOWN_MAX = 3600
+# next_slot is the earliest time the key's rate limit lets it take a request
+_key_state = {
+    key: {"cooldown_until": 0.0, "consecutive": 0, "next_slot": 0.0}
+    for key in API_KEYS
+}
+
+# Persistent cache of successful API responses, opened on first use. Lookups
+# and writes run on worker threads, so the connection is shared under a lock
+response_cache_lock = Lock()
+_response_cache_db = None
+
+# One async gRPC client per API key and one model per (API key, model name),
+# reused across calls so connections stay open instead of being rebuilt every
+# request. Clients are created from translate_text, inside the running loop
+_api_clients = {}
+_model_cache = {}
+
 
 def get_model(model_name):
     """Get a model instance with thread-safe API key rotation for a specific model_name"""
+    # Skip keys still cooling down, unless every key is; then take the next one
+    now = time.monotonic()
+    for _ in range(len(API_KEYS)):
+        api_index = next(_key_counter) % len(API_KEYS)
+        next_api_key = API_KEYS[api_index]
+        if _key_state[next_api_key]["cooldown_until"] <= now:
+            break
+
+    model = _model_cache.get((next_api_key, model_name))
+    if model is None:
+        with api_key_lock:
+            model = _model_cache.get((next_api_key, model_name))
+            if model is None:
+                client = _api_clients.get(next_api_key)
+                if client is None:
+                    client = glm.GenerativeServiceAsyncClient(
+                        client_options={"api_key": next_api_key}
+                    )
+                    _api_clients[next_api_key] = client
+                model = genai.GenerativeModel(
+                    model_name, generation_config=generation_config
+                )
+                # google-generativeai 0.3.1 has no public way to give a model its
+                # own client; left unset, it builds the SDK's global default
+                # client (GOOGLE_API_KEY, not the rotated key). Setting the
+                # private _async_client ties the model to this key; the SDK is
+                # pinned in requirements.txt for it
+                model._async_client = client
+                _model_cache[(next_api_key, model_name)] = model
+
+    return model, next_api_key, api_index
+
+
+def record_key_success(api_key):
+    """Clear the quota cooldown of a key after a successful call"""
+    with api_key_lock:
+        state = _key_state[api_key]
+        state["cooldown_until"] = 0.0
+        state["consecutive"] = 0
+
+
+def record_key_quota_error(api_key):
+    """Put a key that hit its quota into cooldown"""
     with api_key_lock:
-        next_api_key = next(api_key_cycle)
-        api_index = API_KEYS.index(next_api_key) if next_api_key in API_KEYS else -1
-
-    genai.configure(api_key=next_api_key)
-    return (
-        genai.GenerativeModel(model_name, generation_config=generation_config),
-        next_api_key,
-        api_index,
+        state = _key_state[api_key]
+        cooldown = min(KEY_COOLDOWN_MAX, KEY_COOLDOWN * 2 ** state["consecutive"])
+        state["cooldown_until"] = time.monotonic() + cooldown
+        state["consecutive"] += 1
+    logger.info(f"API key {API_KEYS.index(api_key)} cooling down for {cooldown}s")
+
+
+async def wait_for_key_slot(api_key):
+    """Wait until the key may send another request under API_KEY_RPM
+
+    Each key hands out one slot every 60 / API_KEY_RPM seconds; a request that
+    finds its slot already free goes out immediately. Only called from the
+    event loop, and the slot is claimed before awaiting, so no lock is needed.
+    """
+    if API_KEY_RPM <= 0:
+        return
+    state = _key_state[api_key]
+    now = time.monotonic()
+    slot = max(now, state["next_slot"])
+    state["next_slot"] = slot + 60 / API_KEY_RPM
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+
+def _output_token_budget(text):
+    """max_output_tokens for translating text, capped at the configured maximum"""
+    return min(
+        generation_config["max_output_tokens"],
+        OUTPUT_TOKENS_PER_CHAR * len(text) + OUTPUT_TOKENS_MARGIN,
     )
 
 
+def _backoff(attempt, base, cap=MAX_RETRY_DELAY, jitter=RETRY_JITTER):
+    """Exponential backoff delay in seconds with +/- jitter
+
+    Args:
+        attempt: Zero-based count of retries already waited for
+        base: Delay for the first retry
+        cap: Upper bound applied before jitter
+        jitter: Fraction of the delay to randomize
+    """
+    delay = min(cap, base * 2**attempt)
+    return max(0.0, delay * (1 + random.uniform(-jitter, jitter)))
+
+
+def _is_recoverable(error):
+    """Whether waiting before the next attempt can help
+
+    4xx errors other than 429 (bad key, permission, invalid request) will not
+    improve with time, so the next key is tried immediately. Quota, server and
+    network errors are waited out.
+    """
+    if isinstance(error, google_exceptions.ClientError):
+        return isinstance(error, google_exceptions.TooManyRequests)
+    return True
+
+
+def _open_response_cache():
+    """Open the SQLite response cache, or return None if it is disabled/unusable
+
+    Must be called with response_cache_lock held.
+    """
+    global _response_cache_db
+    if _response_cache_db is None:
+        _response_cache_db = False
+        if TRANSLATION_CACHE_DB:
+            try:
+                Path(TRANSLATION_CACHE_DB).parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(TRANSLATION_CACHE_DB, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS translations "
+                    "(key TEXT PRIMARY KEY, model TEXT, value TEXT)"
+                )
+                _response_cache_db = db
+            except sqlite3.Error as e:
+                logger.warning(
+                    f"Translation cache {TRANSLATION_CACHE_DB} disabled: {str(e)}"
+                )
+    return _response_cache_db or None
+
+
+def _response_cache_key(prompt):
+    """Key the cache on the primary model and the full prompt
+
+    The prompt already covers text, glossary and mode; the model is included
+    so switching PRIMARY_LLM_MODEL does not keep serving the old model's output.
+    """
+    return hashlib.blake2b(
+        f"{PRIMARY_LLM_MODEL}\n{prompt}".encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def get_cached_response(key):
+    """Get a previously stored translation for a cache key, or None
+
+    Answers that came from a fallback model are only reused when
+    CACHE_FALLBACK_RESPONSES is enabled.
+    """
+    with response_cache_lock:
+        db = _open_response_cache()
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                "SELECT value, model FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Translation cache lookup failed: {str(e)}")
+            return None
+    if not row:
+        return None
+    value, model_name = row
+    if model_name != PRIMARY_LLM_MODEL and not CACHE_FALLBACK_RESPONSES:
+        return None
+    return value
+
+
+def store_cached_response(key, model_name, translated):
+    """Store a successful translation under its cache key
+
+    Fallback-model answers are skipped unless CACHE_FALLBACK_RESPONSES is enabled.
+    """
+    if model_name != PRIMARY_LLM_MODEL and not CACHE_FALLBACK_RESPONSES:
+        return
+    with response_cache_lock:
+        db = _open_response_cache()
+        if db is None:
+            return
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO translations (key, model, value) "
+                    "VALUES (?, ?, ?)",
+                    (key, model_name, translated),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Translation cache write failed: {str(e)}")
+
+
 async def translate_text(
     text,
     name=None,
     prompt_data=None,
     name_to_translated=None,
-    original_to_translated=None,
+    glossary_automaton=None,
+    run_stats=None,
 ):
-    global api_key_cycle
-    from src.utils import postprocess_text
-    from src.glossary import get_translated_by_name, find_original_matches
+
+    # Nothing to translate; don't spend an API call on markers or non-Chinese text
+    if is_untranslatable(text.strip()):
+        return text
 
     # If no prompt_data provided, fall back to basic glossary lookup
     if not prompt_data:
@@ -58,20 +277,28 @@ async def translate_text(
             if glossary_result:
                 logger.debug(f"Glossary match by name: {name} -> {glossary_result}")
                 return glossary_result
-        if original_to_translated:
-            glossary_matches = find_original_matches(text, original_to_translated)
+        if glossary_automaton:
+            glossary_matches = find_original_matches(text, glossary_automaton)
             if glossary_matches:
                 logger.debug(f"Glossary matches found: {glossary_matches}")
 
     # Use prepared prompt if available, otherwise use default translation prompt
-    if prompt_data and "prompt" in prompt_data:
-        prompt = prompt_data["prompt"]
+    if prompt_data and prompt_data.prompt:
+        prompt = prompt_data.prompt
     else:
-        prompt = f"{START_PROMPT}\n{STORY_CONTEXT_PROMPT}\n{RULES_PROMPT}\n"
         # Default translation prompt
-        prompt += f"""\n{text}"""
+        prompt = _DEFAULT_PROMPT_PREFIX + text
     logger.debug(f"Using prompt:\n{prompt}")
 
+    cache_key = _response_cache_key(prompt)
+    cached_translation = await asyncio.to_thread(get_cached_response, cache_key)
+    if cached_translation is not None:
+        logger.debug(f"Reusing cached API response for: {text}")
+        if run_stats:
+            run_stats["from_cache"] += 1
+        return cached_translation
+
+    call_config = {"max_output_tokens": _output_token_budget(text)}
     all_available_models = [PRIMARY_LLM_MODEL] + FALLBACK_LLM_MODELS
     global_retry_count = 0
 
@@ -83,20 +310,44 @@ async def translate_text(
             api_retries = 0
 
             while api_retries < max_api_retries:
+                # Reset per attempt so a failing get_model is not blamed on, or
+                # cools down, the key of the previous attempt
+                api_key = api_index = None
                 try:
                     model_instance, api_key, api_index = get_model(current_model_name)
+                    await wait_for_key_slot(api_key)
                     logger.api_call(api_index, api_key, current_model_name)
                     logger.translation_start(name, text, current_model_name)
-                    line_start = time.time()
-                    response = await asyncio.to_thread(
-                        model_instance.generate_content, prompt
+                    line_start = time.perf_counter()
+                    response = await model_instance.generate_content_async(
+                        prompt, generation_config=call_config
                     )
-                    line_end = time.time()
+                    line_end = time.perf_counter()
                     duration = line_end - line_start
 
+                    record_key_success(api_key)
+                    if (
+                        response.candidates
+                        and response.candidates[0].finish_reason == _MAX_TOKENS
+                        and call_config["max_output_tokens"]
+                        < generation_config["max_output_tokens"]
+                    ):
+                        logger.debug(
+                            "Response hit the shortened output budget, retrying with the full budget"
+                        )
+                        call_config = {
+                            "max_output_tokens": generation_config["max_output_tokens"]
+                        }
+                        continue
                     if response.parts:
                         translated = response.text.strip()
                         translated = postprocess_text(translated)
+                        await asyncio.to_thread(
+                            store_cached_response,
+                            cache_key,
+                            current_model_name,
+                            translated,
+                        )
                         logger.translation_output(
                             translated, duration, current_model_name
                         )
@@ -114,29 +365,28 @@ async def translate_text(
                                 f"All API keys exhausted for Model {current_model_name}. Switching to next fallback model."
                             )
                             current_model_idx += 1  # Move to the next model
-                            # Reset API key cycle for the new model to start fresh
-                            with api_key_lock:
-                                pass  # Removed api_key_cycle reset here
                             break  # Break from API key retry loop to try next model
 
                 except Exception as e:
                     logger.error(
                         f"Translation error with Model {current_model_name} and API key {api_index}: {str(e)}"
                     )
+                    if api_key and isinstance(e, google_exceptions.TooManyRequests):
+                        record_key_quota_error(api_key)
                     api_retries += 1
                     if api_retries < max_api_retries:
                         logger.info(
                             f"Retrying with next API key for Model {current_model_name} (Attempt {api_retries + 1}/{max_api_retries})"
                         )
-                        await asyncio.sleep(RATE_LIMIT_DELAY)
+                        if _is_recoverable(e):
+                            await asyncio.sleep(
+                                _backoff(api_retries - 1, RATE_LIMIT_DELAY)
+                            )
                     else:
                         logger.warning(
                             f"All API keys exhausted for Model {current_model_name}. Switching to next fallback model."
                         )
                         current_model_idx += 1  # Move to the next model
-                        # Reset API key cycle for the new model to start fresh
-                        with api_key_lock:
-                            pass  # Removed api_key_cycle reset here
                         break  # Break from API key retry loop to try next model
 
         # If we reach here, all models and API keys have been exhausted for the current global retry cycle
@@ -145,10 +395,9 @@ async def translate_text(
                 f"All models and API keys exhausted. Initiating global retry {global_retry_count + 1}/{MAX_GLOBAL_RETRIES + 1} after delay."
             )
             global_retry_count += 1
-            await asyncio.sleep(RATE_LIMIT_IF_QUOTA_EXCEEDED)
-            # Reset API key cycle for the new global retry to start fresh
-            with api_key_lock:
-                api_key_cycle = itertools.cycle(API_KEYS)
+            await asyncio.sleep(
+                _backoff(global_retry_count - 1, RATE_LIMIT_IF_QUOTA_EXCEEDED)
+            )
         else:
             # All global retries exhausted
             break
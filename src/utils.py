@@ -1,3 +1,59 @@
+import os
+import re
+import orjson
+from pathlib import Path
+
+
+def list_json_files(directory):
+    """List the *.json files directly inside a directory (cheaper than glob)
+
+    os.scandir reports the entry type from the directory listing itself, so
+    subdirectories named *.json are dropped without an extra stat per file.
+    """
+    with os.scandir(directory) as entries:
+        return [
+            Path(entry.path)
+            for entry in entries
+            if entry.name.endswith(".json") and entry.is_file()
+        ]
+
+
+def get_entries(data):
+    """Get the entry list of a localisation file in either the Array or flat layout"""
+    entries = data.get("entries", [])
+    if isinstance(entries, dict) and "Array" in entries:
+        return entries["Array"]
+    return entries if isinstance(entries, list) else []
+
+
+def get_entry_fields(entry):
+    """Get (name, text) from an entry in either the key/value or Name/Text layout"""
+    return (
+        entry.get("key") or entry.get("Name", ""),
+        entry.get("value") or entry.get("Text", ""),
+    )
+
+
+def write_json_file(path, data):
+    """Serialize data as indented JSON and write it in one call (run via to_thread)"""
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+
+def write_pairs_file(path, translation_pairs):
+    """Write original=translated lines for every pair (run via to_thread)
+
+    Lines are streamed through the buffered file instead of joined into one
+    string first, so no full-size copy of the output is held in memory.
+    """
+    lines = (
+        f"{original}={translated}" for original, translated in translation_pairs.items()
+    )
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        # Newline-separated with no trailing newline, as "\n".join would produce
+        f.write(next(lines, ""))
+        f.writelines(f"\n{line}" for line in lines)
+
+
 def preprocess_text(text):
     return text.strip().replace("\r", "[|]").replace("\n", "[||]")
 
@@ -20,17 +76,36 @@ def postprocess_text(text, for_json=True):
         return text.replace("\r", "\\r").replace("\n", "\\n")
 
 
-SPECIAL_CHARS = [
-    "？？？",
-    "{{title}}",
-    "???",
-    "[{{0}}]",
-    "[{0}]",
-    "[|]",
-    "[||]",
-    "……。",
-    "……！",
-]
+SPECIAL_CHARS = frozenset(
+    [
+        "？？？",
+        "{{title}}",
+        "???",
+        "[{{0}}]",
+        "[{0}]",
+        "[|]",
+        "[||]",
+        "……。",
+        "……！",
+    ]
+)
+
+# CJK ideographs (basic, extension A/B+ and compatibility blocks)
+_CJK_RE = re.compile("[\u3400-\u9fff\uf900-\ufaff\U00020000-\U0002fa1f]")
+
+
+def is_untranslatable(text):
+    """Whether text can be kept as-is without asking the model
+
+    True for special markers and for text with no Chinese characters at all
+    (numbers, Latin names, punctuation-only lines)
+
+    Args:
+        text: Stripped text to check
+    """
+    return text in SPECIAL_CHARS or not _CJK_RE.search(text)
+
+
 START_PROMPT = "Bạn là một chuyên gia dịch thuật từ Tiếng Trung (Giản thể) sang Tiếng Việt và đã có kinh nghiệm bản địa hóa các tựa game từ các thứ tiếng sang Tiếng Việt."
 
 RULES_PROMPT = """
@@ -56,3 +131,24 @@ Bối cảnh câu chuyện: Legend of Mortal là câu chuyện bối cảnh ki
 Nhân vật chính là Triệu Hoạt - Đệ tử ngoại thất của Đường Môn. Triệu Hoạt là một con người không có gì - xuất thân mơ hồ, nhan sắc xấu xí, võ công yếu kém
 Nhưng đến cuối cùng, số mệnh Đường Môn, hoặc cả võ lâm giang hồ cùng nhà Tống nằm trong tay Triệu Hoạt.
 """
+
+# Shared opening of every translation prompt, concatenated once at import
+PROMPT_HEADER = f"{START_PROMPT}\n{STORY_CONTEXT_PROMPT}\n{RULES_PROMPT}\n"
+
+# Standalone prompt used by tool/improve_glossary.py to re-translate glossary terms
+GLOSSARY_IMPROVE_PROMPT = """Bạn là một chuyên gia dịch thuật từ Tiếng Trung (Giản thể) sang Tiếng Việt và đã có kinh nghiệm dịch game.
+Đây là một phần của câu chuyện trong tựa game Legend of Mortal có bối cảnh kiếm hiệp cổ trang Trung Quốc mà cần bạn dịch
+Nhiệm vụ của bạn là:
+1. Dịch văn bản trên từ Tiếng Trung (Giản thể) sang Tiếng Việt, đảm bảo câu văn giữ ý nghĩa của văn bản gốc, đồng thời câu văn phải tự nhiên, mượt mà, phù hợp với bối cảnh Kiếm hiệp cổ trang Trung Quốc của game Legend of Mortal
+2. Tự động phát hiện và viết hoa đúng các danh từ riêng (tên người, địa danh, tổ chức, v.v.).
+3. Giữ nguyên các kí hiệu đánh dấu đặc biệt như [|], [||], ???, ???, {{title}}, [{{0}}], [{0}], ... và các ký hiệu khác. Đây là các ký hiệu cho code trong game Legend of Mortal.
+Ví dụ:
+    {title} -> {title}
+    捅人伤害+{0:N0}  骰子+{1:N0} -> Đâm người gây thương tích +{0:N0}  Xúc xắc +{1:N0}
+    南宫伯伯，南宫爷爷，萤儿给您们请安。\r\n恭贺爷爷百岁大寿，祝您老人家福如 Đông Hải,寿比南山。-> Nam Cung bá bá, Nam Cung gia gia, Huỳnh Nhi bái kiến hai vị.\r\nChúc gia gia thượng thọ trăm tuổi, nguyện lão nhân gia phúc như Đông Hải, thọ tùng Nam Sơn.
+4. Đối với cụm từ ngắn (1-2 chữ), cần xem xét bối cảnh game và ưu tiên dịch theo nghĩa hành động/trạng thái thay vì nghĩa sự vật.
+Ví dụ:
+    "整装" nên dịch là "chuẩn bị" thay vì "toàn bộ vũ khí"
+5. Chỉ trả về phần văn bản đã được dịch dươi định dạng plain text.
+6. Sử dụng bản dịch thô để THAM KHẢO về xưng hô cũng như mối quan hệ giữa các nhân vật.
+7. Đảm bảo bản dịch không còn chứa văn bản tiếng Trung nào."""
@@ -3,6 +3,7 @@
 
 import json
 import os
+import re
 import argparse
 from typing import List, Dict
 
@@ -44,6 +45,8 @@ def create_grossary(original_json_path: str, translated_json_path: str, output_j
 def create_aggregated_glossary(src_folder: str, tgt_folder: str, output_json_path: str, output_txt_path: str, skip_keys: set):
     all_glossary: List[Dict[str, str]] = []
     all_txt_lines: List[str] = []
+    # One precompiled alternation instead of an `in` scan per skip key
+    skip_pattern = re.compile('|'.join(map(re.escape, skip_keys))) if skip_keys else None
 
     for filename in os.listdir(src_folder):
         if filename.endswith('.json'):
@@ -58,7 +61,7 @@ def create_aggregated_glossary(src_folder: str, tgt_folder: str, output_json_pat
                 original_map = load_entries(original_json)
                 translated_map = load_entries(translated_json)
                 for name, original_text in original_map.items():
-                    if any(key in name for key in skip_keys):
+                    if skip_pattern and skip_pattern.search(name):
                         continue
                     translated_text = translated_map.get(name, '')
                     all_glossary.append({
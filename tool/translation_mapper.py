@@ -1,5 +1,5 @@
-import json
 import sys
+import orjson
 from pathlib import Path
 
 # Add project root to sys.path
@@ -7,25 +7,20 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from src.glossary import load_glossary, find_original_matches
 from src.config import INPUT_DIR
+from src.utils import get_entries, list_json_files
 
 def load_entries(json_path):
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    entries = data.get('entries', [])
-    if isinstance(entries, dict) and 'Array' in entries:
-        entries_list = entries['Array']
-    else:
-        entries_list = entries
-    return entries_list
+    return get_entries(orjson.loads(Path(json_path).read_bytes()))
 
-def map_translation_context(json_path, glossary_file_path=None):
+def map_translation_context(json_path, glossary_file_path=None, glossary_automaton=None):
     entries = load_entries(json_path)
-    name_to_translated, original_to_translated = load_glossary(glossary_file_path)
+    if glossary_automaton is None:
+        _, _, glossary_automaton = load_glossary(glossary_file_path)
     mapped = []
     for entry in entries:
         original_text = entry.get('value') or entry.get('Text', '')
         raw_translated_text = entry.get('TranslatedText') or entry.get('translated') or entry.get('Text', '')
-        glossary_matches = find_original_matches(original_text, original_to_translated)
+        glossary_matches = find_original_matches(original_text, glossary_automaton)
         mapped.append({
             'original_text': original_text,
             'raw_translated_text': raw_translated_text,
@@ -35,9 +30,13 @@ def map_translation_context(json_path, glossary_file_path=None):
 
 def map_all_files(glossary_file_path=None):
     json_dir = Path(INPUT_DIR)
+    # Load the glossary once for the whole directory, not once per file
+    _, _, glossary_automaton = load_glossary(glossary_file_path)
     all_mapped = {}
-    for file_path in json_dir.glob('*.json'):
-        all_mapped[file_path.name] = map_translation_context(file_path, glossary_file_path)
+    for file_path in list_json_files(json_dir):
+        all_mapped[file_path.name] = map_translation_context(
+            file_path, glossary_file_path, glossary_automaton
+        )
     return all_mapped
 
 if __name__ == "__main__":